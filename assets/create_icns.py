@@ -10,12 +10,63 @@ import sys
 import subprocess
 import tempfile
 import shutil
-import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+
+# PIL 模块缓存：None 表示尚未尝试导入，False 表示不可用
+_PIL = None
+
+
+def _load_pil():
+    """只尝试导入一次 PIL.Image，不可用时返回 None"""
+    global _PIL
+    if _PIL is None:
+        try:
+            from PIL import Image
+            _PIL = Image
+        except ImportError:
+            _PIL = False
+    return _PIL or None
+
+
+def _fastcopy(src, dst):
+    """只复制文件内容（iconset 为临时目录，无需复制权限/元数据）
+
+    shutil.copyfile 在 macOS/Linux 上使用 fcopyfile/sendfile 在内核中完成复制。
+    """
+    shutil.copyfile(src, dst)
+
+
+def _clone_or_copy(src, dst):
+    """以硬链接/APFS 克隆代替字节复制，失败时回退到 _fastcopy
+
+    iconutil 只读取 iconset 中的文件，随后整个目录被删除，
+    因此硬链接是安全的。
+    """
+    try:
+        os.link(src, dst)
+        return
+    except OSError:
+        pass
+
+    if sys.platform == "darwin":
+        try:
+            import ctypes
+            libc = ctypes.CDLL("/usr/lib/libSystem.dylib", use_errno=True)
+            if libc.clonefile(os.fsencode(str(src)), os.fsencode(str(dst)), 0) == 0:
+                return
+        except (OSError, AttributeError):
+            pass
+
+    _fastcopy(src, dst)
+
+
 class IconGenerator:
-    def __init__(self):
+    def __init__(self, force=False):
         self.assets_dir = Path(__file__).parent
+        self.force = force
         self.required_sizes = [16, 32, 128, 256, 512, 1024]
         self.icon_mapping = {
             16: [("icon_16x16.png", "icon_16x16.png")],
@@ -27,6 +78,15 @@ class IconGenerator:
         }
         self.available_tools = []
         self.detected_issues = []
+        # 图像尺寸缓存，避免对同一源文件重复调用 sips / 打开图像
+        self._size_cache = {}
+        # 已解码的源图像缓存（create_iconset 中多个线程共享）
+        self._decoded_cache = {}
+        # 每个源路径一把锁：同一源只解码一次，不同源可在不同线程中并行解码
+        self._decode_locks = {}
+        self._decode_locks_guard = threading.Lock()
+        # iconset 暂存目录（位于系统临时目录，生成 .icns 后删除）
+        self.staging_dir = None
 
     def log(self, message, level="INFO"):
         """Log output"""
@@ -55,8 +115,8 @@ class IconGenerator:
 
         for tool, description in tools.items():
             try:
-                result = subprocess.run(["which", tool], capture_output=True, text=True)
-                if result.returncode == 0:
+                # shutil.which 在进程内查找 PATH，无需启动 which 子进程
+                if shutil.which(tool):
                     self.available_tools.append(tool)
                     self.log(f"✓ {tool} 可用 - {description}")
                 else:
@@ -66,24 +126,34 @@ class IconGenerator:
 
         return len(self.available_tools) > 0
 
+    def _scan_icon_entries(self):
+        """列出 assets 目录中的源 PNG（icon_*.png，不含符号链接）"""
+        # os.scandir 的 DirEntry 自带文件类型信息，无需逐个 stat
+        with os.scandir(self.assets_dir) as entries:
+            return [
+                entry for entry in entries
+                if entry.name.startswith("icon_") and entry.name.endswith(".png")
+                and entry.is_file(follow_symlinks=False)
+            ]
+
     def scan_available_icons(self):
         """扫描可用的图标文件"""
         self.log("扫描可用图标文件...")
 
         available_icons = {}
-        icon_files = list(self.assets_dir.glob("icon_*.png"))
+        icon_files = self._scan_icon_entries()
 
         for icon_file in icon_files:
             # 解析文件名获取尺寸
             try:
-                parts = icon_file.stem.split("_")
+                parts = icon_file.name[:-len(".png")].split("_")
                 if len(parts) >= 2:
                     size_str = parts[1]
                     if size_str.endswith("x1024"):
                         size = 1024
                     else:
                         size = int(size_str.split("x")[0])
-                    available_icons[size] = str(icon_file)
+                    available_icons[size] = icon_file.path
                     self.log(f"✓ 发现 {size}x{size} 图标: {icon_file.name}")
             except (ValueError, IndexError):
                 self.log(f"✗ 无法解析图标文件名: {icon_file.name}", "WARNING")
@@ -114,7 +184,36 @@ class IconGenerator:
 
         output_file = self.assets_dir / f"icon_{size}x{size}.png"
 
-        # 方法1: 使用 sips
+        # 方法1: 使用 Python PIL（进程内处理，无需启动子进程）
+        Image = _load_pil()
+        if Image:
+            try:
+                with Image.open(source_file) as img:
+                    # 允许解码器在解码阶段降采样（对 JPEG 等格式有效），并一次性完成解码
+                    img.draft("RGBA", (size, size))
+                    img.load()
+
+                    # 确保图标是正方形
+                    width, height = img.size
+                    if width != height:
+                        # 裁剪为正方形
+                        size_min = min(width, height)
+                        left = (width - size_min) // 2
+                        top = (height - size_min) // 2
+                        img = img.crop((left, top, left + size_min, top + size_min))
+
+                    # 调整大小
+                    resized_img = img.resize((size, size), Image.Resampling.LANCZOS)
+                    resized_img.save(output_file, "PNG")
+
+                self.log(f"✓ 使用 PIL 成功生成 {size}x{size} 图标")
+                return str(output_file)
+            except Exception as e:
+                self.log(f"PIL 处理出错: {e}", "WARNING")
+        else:
+            self.log("PIL (Pillow) 不可用，跳过 Python 图像处理", "DEBUG")
+
+        # 方法2: 使用 sips
         if "sips" in self.available_tools:
             try:
                 cmd = [
@@ -130,32 +229,6 @@ class IconGenerator:
             except Exception as e:
                 self.log(f"sips 处理出错: {e}", "WARNING")
 
-        # 方法2: 使用 Python PIL (如果可用)
-        try:
-            from PIL import Image
-
-            with Image.open(source_file) as img:
-                # 确保图标是正方形
-                width, height = img.size
-                if width != height:
-                    # 裁剪为正方形
-                    size_min = min(width, height)
-                    left = (width - size_min) // 2
-                    top = (height - size_min) // 2
-                    img = img.crop((left, top, left + size_min, top + size_min))
-
-                # 调整大小
-                resized_img = img.resize((size, size), Image.Resampling.LANCZOS)
-                resized_img.save(output_file, "PNG")
-
-            self.log(f"✓ 使用 PIL 成功生成 {size}x{size} 图标")
-            return str(output_file)
-
-        except ImportError:
-            self.log("PIL (Pillow) 不可用，跳过 Python 图像处理", "DEBUG")
-        except Exception as e:
-            self.log(f"PIL 处理出错: {e}", "WARNING")
-
         self.detected_issues.append(f"无法生成 {size}x{size} 图标")
         return None
 
@@ -163,11 +236,10 @@ class IconGenerator:
         """创建 iconset 目录结构"""
         self.log("创建 iconset 目录结构...")
 
-        iconset_dir = self.assets_dir / "MultiTodo.iconset"
-
-        # 清理旧的 iconset
-        if iconset_dir.exists():
-            shutil.rmtree(iconset_dir)
+        # iconset 只是 iconutil 的一次性输入，放在 $TMPDIR 下暂存，不写入 assets 目录
+        # （iconutil 要求目录名以 .iconset 结尾）
+        self.staging_dir = Path(tempfile.mkdtemp(prefix="MultiTodo-icns-"))
+        iconset_dir = self.staging_dir / "MultiTodo.iconset"
         iconset_dir.mkdir()
 
         # macOS .icns 需要的文件格式
@@ -184,87 +256,128 @@ class IconGenerator:
             ("icon_512x512@2x.png", 1024)
         ]
 
-        generated_files = []
+        # 先为每个条目确定源图标，再并行缩放/复制
+        jobs = []
+        # 每个源文件只检查一次是否存在
+        existing_sources = {path for path in set(available_icons.values()) if os.path.exists(path)}
+        # 已被前面条目原样暂存（未缩放）的源文件，再次原样使用时以符号链接代替再次写入
+        staged_as_is = set()
 
         for filename, target_size in iconset_files:
             target_path = iconset_dir / filename
 
-            # 寻找合适的源图标
-            source_file = None
-
-            # 直接查找匹配的图标
-            if str(target_size) in [str(s) for s in available_icons.keys()]:
-                for size, path in available_icons.items():
-                    if size == target_size:
-                        source_file = path
-                        break
+            # 寻找合适的源图标（直接查找匹配的尺寸）
+            source_file = available_icons.get(target_size)
 
-            # 如果没有直接匹配，寻找最接近的图标
+            # 如果没有直接匹配，从最接近的更大尺寸缩放（避免从最大图标重新采样或放大）
             if not source_file and available_icons:
-                best_size = min(available_icons.keys(),
-                              key=lambda x: abs(x - target_size))
+                larger_sizes = [s for s in available_icons.keys() if s >= target_size]
+                if larger_sizes:
+                    best_size = min(larger_sizes)
+                else:
+                    best_size = max(available_icons.keys())
                 source_file = available_icons[best_size]
                 self.log(f"使用 {best_size}x{best_size} 图标缩放到 {target_size}x{target_size}")
 
-            if source_file and os.path.exists(source_file):
-                try:
-                    if target_size != self._get_image_size(source_file):
-                        # 需要缩放
-                        self._resize_image(source_file, target_path, target_size)
-                    else:
-                        # 直接复制
-                        shutil.copy2(source_file, target_path)
-
-                    generated_files.append(target_path)
-                    self.log(f"✓ 创建 {filename}")
-
-                except Exception as e:
-                    self.log(f"✗ 创建 {filename} 失败: {e}", "ERROR")
-                    return None
+            if source_file and source_file in existing_sources:
+                # 尺寸按源文件缓存，每个源最多探测一次
+                needs_resize = target_size != self._get_image_size(source_file)
+                duplicate = not needs_resize and source_file in staged_as_is
+                if not needs_resize:
+                    staged_as_is.add(source_file)
+                jobs.append((filename, source_file, target_path, target_size,
+                             needs_resize, duplicate))
             else:
                 self.log(f"✗ 无法为 {filename} 找到源图标", "ERROR")
                 return None
 
+        def stage(job):
+            filename, source_file, target_path, target_size, needs_resize, duplicate = job
+            try:
+                if needs_resize:
+                    # 需要缩放
+                    self._resize_image(source_file, target_path, target_size)
+                elif duplicate:
+                    # 同一源文件已被前面的条目原样暂存过，直接链接到源文件
+                    try:
+                        os.symlink(Path(source_file).resolve(), target_path)
+                    except OSError:
+                        _clone_or_copy(source_file, target_path)
+                else:
+                    # 直接复制
+                    _clone_or_copy(source_file, target_path)
+                return None
+            except Exception as e:
+                return e
+
+        # PIL 缩放/编码和 sips 子进程都会释放 GIL，各条目互不依赖，可用线程并行
+        try:
+            with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+                errors = list(executor.map(stage, jobs))
+        finally:
+            # 解码后的源图像只在本次 iconset 构建中复用，结束后释放
+            self._decoded_cache.clear()
+            self._decode_locks.clear()
+
+        generated_files = []
+        for (filename, _, target_path, _, _, _), error in zip(jobs, errors):
+            if error is not None:
+                self.log(f"✗ 创建 {filename} 失败: {error}", "ERROR")
+                return None
+            generated_files.append(target_path)
+            self.log(f"✓ 创建 {filename}")
+
         return iconset_dir, generated_files
 
     def _get_image_size(self, image_path):
-        """获取图像尺寸"""
-        try:
-            if "sips" in self.available_tools:
+        """获取图像尺寸（按路径缓存）"""
+        key = str(image_path)
+        size = self._size_cache.get(key)
+        if size is None:
+            size = self._read_image_size(key)
+            self._size_cache[key] = size
+        return size
+
+    def _read_image_size(self, image_path):
+        """读取图像尺寸"""
+        # 优先使用 PIL（只读取文件头）
+        Image = _load_pil()
+        if Image:
+            try:
+                with Image.open(image_path) as img:
+                    return max(img.size)
+            except Exception:
+                pass
+
+        # 备用方法：使用 sips
+        if "sips" in self.available_tools:
+            try:
                 result = subprocess.run(
                     ["sips", "-g", "pixelWidth", "-g", "pixelHeight", image_path],
                     capture_output=True, text=True
                 )
                 if result.returncode == 0:
                     lines = result.stdout.strip().split('\n')
-                    width = int(lines[0].split()[-1])
-                    height = int(lines[1].split()[-1])
+                    width = int(lines[-2].split()[-1])
+                    height = int(lines[-1].split()[-1])
                     return max(width, height)
+            except Exception:
+                pass
+        return 0
 
-            # 备用方法：使用 PIL
-            from PIL import Image
-            with Image.open(image_path) as img:
-                return max(img.size)
-        except:
-            return 0
+    def _load_square_source(self, Image, source_path):
+        """解码源图像并裁剪为正方形（按路径缓存，多个条目共用同一源时只解码一次）"""
+        key = str(source_path)
+        with self._decode_locks_guard:
+            lock = self._decode_locks.setdefault(key, threading.Lock())
 
-    def _resize_image(self, source_path, target_path, target_size):
-        """调整图像大小"""
-        # 优先使用 sips
-        if "sips" in self.available_tools:
-            try:
-                subprocess.run([
-                    "sips", "-z", str(target_size), str(target_size),
-                    source_path, "--out", str(target_path)
-                ], check=True, capture_output=True)
-                return
-            except subprocess.CalledProcessError:
-                pass
+        with lock:
+            img = self._decoded_cache.get(key)
+            if img is None:
+                # load() 完成解码后会关闭以文件名打开的文件，直接保留该图像即可
+                img = Image.open(key)
+                img.load()
 
-        # 备用：使用 PIL
-        try:
-            from PIL import Image
-            with Image.open(source_path) as img:
                 # 确保是正方形
                 width, height = img.size
                 if width != height:
@@ -273,10 +386,35 @@ class IconGenerator:
                     top = (height - size_min) // 2
                     img = img.crop((left, top, left + size_min, top + size_min))
 
+                self._decoded_cache[key] = img
+        return img
+
+    def _resize_image(self, source_path, target_path, target_size):
+        """调整图像大小"""
+        # 优先使用 PIL
+        Image = _load_pil()
+        if Image:
+            try:
+                img = self._load_square_source(Image, source_path)
                 resized_img = img.resize((target_size, target_size), Image.Resampling.LANCZOS)
-                resized_img.save(target_path, "PNG")
-        except Exception as e:
-            raise Exception(f"无法调整图像大小: {e}")
+                resized_img.save(target_path, "PNG", compress_level=1, optimize=False)
+                return
+            except Exception as e:
+                if "sips" not in self.available_tools:
+                    raise Exception(f"无法调整图像大小: {e}")
+
+        # 备用：使用 sips
+        if "sips" in self.available_tools:
+            try:
+                subprocess.run([
+                    "sips", "-z", str(target_size), str(target_size),
+                    source_path, "--out", str(target_path)
+                ], check=True, capture_output=True)
+                return
+            except subprocess.CalledProcessError as e:
+                raise Exception(f"无法调整图像大小: {e}")
+
+        raise Exception("无法调整图像大小: PIL 和 sips 均不可用")
 
     def create_icns_file(self, iconset_dir):
         """使用 iconutil 创建 .icns 文件"""
@@ -293,7 +431,8 @@ class IconGenerator:
 
         # 列出iconset内容
         if iconset_dir.exists():
-            iconset_files = list(iconset_dir.glob("*"))
+            with os.scandir(iconset_dir) as entries:
+                iconset_files = list(entries)
             self.log(f"iconset文件数量: {len(iconset_files)}")
             for f in iconset_files:
                 self.log(f"  - {f.name} ({f.stat().st_size} bytes)")
@@ -310,19 +449,20 @@ class IconGenerator:
             if result.returncode == 0:
                 self.log(f"✓ iconutil 命令执行成功")
 
-                # 关键验证：检查文件是否真的创建了
-                if not icns_path.exists():
+                # 关键验证：检查文件是否真的创建了（一次 stat 同时获取是否存在与大小）
+                try:
+                    file_size = icns_path.stat().st_size
+                except FileNotFoundError:
                     self.log(f"❌ iconutil 报告成功但文件不存在: {icns_path}", "ERROR")
                     self.log(f"当前工作目录: {os.getcwd()}")
                     self.log(f"assets目录内容: {list(self.assets_dir.glob('*'))}")
                     return False
 
                 # 验证文件有内容
-                if icns_path.stat().st_size == 0:
+                if file_size == 0:
                     self.log(f"❌ .icns 文件为空", "ERROR")
                     return False
 
-                file_size = icns_path.stat().st_size
                 self.log(f"✓ 成功创建 {icns_path} ({file_size:,} bytes)")
                 return True
             else:
@@ -338,9 +478,10 @@ class IconGenerator:
 
     def cleanup(self, iconset_dir=None):
         """清理临时文件"""
-        if iconset_dir and iconset_dir.exists():
+        target_dir = self.staging_dir or iconset_dir
+        if target_dir and target_dir.exists():
             try:
-                shutil.rmtree(iconset_dir)
+                shutil.rmtree(target_dir)
                 self.log("✓ 清理临时文件")
             except Exception as e:
                 self.log(f"⚠️ 清理临时文件失败: {e}", "WARNING")
@@ -361,21 +502,39 @@ class IconGenerator:
                 "检查 macOS 系统是否完整安装了开发工具"
             ])
 
-        # 保存报告
+        # 保存报告（json 仅在此处使用，按需导入）
+        import json
+
         report_file = self.assets_dir / "icon_generation_report.json"
         try:
-            with open(report_file, 'w', encoding='utf-8') as f:
-                json.dump(report, f, indent=2, ensure_ascii=False)
+            # 先序列化再一次性写入，避免 json.dump 产生大量小块写操作
+            data = json.dumps(report, indent=2, ensure_ascii=False).encode('utf-8')
+            report_file.write_bytes(data)
             self.log(f"✓ 生成报告: {report_file}")
         except Exception as e:
             self.log(f"⚠️ 保存报告失败: {e}", "WARNING")
 
         return report
 
+    def is_icns_up_to_date(self):
+        """icon.icns 是否比所有源 PNG 都新"""
+        icns_path = self.assets_dir / "icon.icns"
+        try:
+            dst_mtime = icns_path.stat().st_mtime
+        except OSError:
+            return False
+
+        src_mtimes = [entry.stat().st_mtime for entry in self._scan_icon_entries()]
+        return bool(src_mtimes) and dst_mtime > max(src_mtimes)
+
     def run(self):
         """执行图标生成流程"""
         self.log("开始 macOS 图标生成流程...")
 
+        if not self.force and self.is_icns_up_to_date():
+            self.log("✓ icon.icns 已是最新，跳过生成（使用 --force 强制重新生成）")
+            return True
+
         try:
             # 检查环境
             if not self.check_environment():
@@ -412,9 +571,6 @@ class IconGenerator:
             # 创建 .icns 文件
             success = self.create_icns_file(iconset_dir)
 
-            # 清理
-            self.cleanup(iconset_dir)
-
             # 生成报告
             report = self.generate_report()
 
@@ -429,6 +585,10 @@ class IconGenerator:
             self.log(f"❌ 图标生成过程中出现未预期的错误: {e}", "ERROR")
             return False
 
+        finally:
+            # 无论成功、失败还是异常，都删除 $TMPDIR 下的暂存目录
+            self.cleanup()
+
 
 def main():
     """Main function"""
@@ -436,7 +596,7 @@ def main():
     print("macOS Icon Generator")
     print("=" * 60)
 
-    generator = IconGenerator()
+    generator = IconGenerator(force="--force" in sys.argv[1:])
     success = generator.run()
 
     if success:
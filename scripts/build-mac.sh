@@ -27,17 +27,14 @@ fi
 # 步骤 1: 生成 icon.icns
 echo ""
 echo "📦 步骤 1/5: 生成 macOS 图标文件..."
+# 图标生成与依赖安装/构建互不依赖，放到后台并行执行，打包前再等待结果
+ICNS_PID=""
 if [ ! -f "assets/icon.icns" ]; then
-    echo "正在生成 icon.icns..."
-    cd assets
-    python3 create_icns.py
-    cd ..
-
-    if [ ! -f "assets/icon.icns" ]; then
-        echo "❌ 错误：icon.icns 生成失败"
-        exit 1
-    fi
-    echo "✅ icon.icns 生成成功"
+    echo "正在后台生成 icon.icns..."
+    (cd assets && exec python3 create_icns.py) &
+    ICNS_PID=$!
+    # set -e 下后续步骤失败时脚本会提前退出，确保不留下仍在写 assets/ 的后台生成进程
+    trap '[ -n "$ICNS_PID" ] && kill "$ICNS_PID" 2>/dev/null' EXIT
 else
     echo "✅ icon.icns 已存在，跳过"
 fi
@@ -45,12 +42,28 @@ fi
 # 步骤 2: 安装依赖
 echo ""
 echo "📦 步骤 2/5: 安装依赖..."
-if [ ! -d "node_modules" ]; then
-    echo "正在运行 npm install..."
-    npm install
-    echo "✅ 依赖安装完成"
-else
+# node_modules 以 package-lock.json 的哈希为键：哈希未变时直接复用，变化后才重新安装
+LOCK_HASH_FILE="node_modules/.multitodo-lock-hash"
+LOCK_HASH=""
+if [ -f "package-lock.json" ]; then
+    LOCK_HASH=$(shasum -a 256 package-lock.json | cut -d ' ' -f 1)
+fi
+
+if [ -d "node_modules" ] && [ -z "$LOCK_HASH" ]; then
     echo "✅ node_modules 已存在，跳过"
+elif [ -d "node_modules" ] && [ "$(cat "$LOCK_HASH_FILE" 2>/dev/null)" = "$LOCK_HASH" ]; then
+    echo "✅ node_modules 与 package-lock.json 一致，跳过"
+else
+    # 有 package-lock.json 时使用 npm ci：直接按锁文件安装，跳过依赖树解析，更快且可复现
+    if [ -n "$LOCK_HASH" ]; then
+        echo "正在运行 npm ci..."
+        npm ci
+        echo "$LOCK_HASH" > "$LOCK_HASH_FILE"
+    else
+        echo "⚠️  警告：未找到 package-lock.json，回退到 npm install（安装结果可能不确定）"
+        npm install
+    fi
+    echo "✅ 依赖安装完成"
 fi
 
 # 步骤 3: 重建原生模块
@@ -69,6 +82,19 @@ echo "🔨 步骤 4/5: 构建应用..."
 npm run build
 echo "✅ 构建完成"
 
+# 打包需要 icon.icns，等待后台图标生成完成
+if [ -n "$ICNS_PID" ]; then
+    echo ""
+    echo "⏳ 等待 icon.icns 生成完成..."
+    if ! wait "$ICNS_PID" || [ ! -f "assets/icon.icns" ]; then
+        ICNS_PID=""
+        echo "❌ 错误：icon.icns 生成失败"
+        exit 1
+    fi
+    ICNS_PID=""
+    echo "✅ icon.icns 生成成功"
+fi
+
 # 步骤 5: 打包
 echo ""
 echo "📦 步骤 5/5: 创建 macOS 安装包..."
@@ -7,7 +7,7 @@
 
 const fs = require('fs');
 const path = require('path');
-const { execSync } = require('child_process');
+const { execSync, execFileSync } = require('child_process');
 
 const colors = {
   reset: '\x1b[0m',
@@ -118,7 +118,8 @@ function checkXcode() {
   logInfo(`检查 Xcode Command Line Tools...`);
   
   try {
-    execSync('xcode-select -p', { encoding: 'utf-8', stdio: 'pipe' });
+    // 直接执行可执行文件，无需经由 /bin/sh 中转
+    execFileSync('xcode-select', ['-p'], { encoding: 'utf-8', stdio: 'pipe' });
     logSuccess(`Xcode Command Line Tools 已安装`);
     return true;
   } catch (error) {
@@ -16,6 +16,12 @@ module.exports = (env, argv) => {
         config: [__filename], // 当配置文件更改时，缓存失效
       },
     },
+    snapshot: {
+      // 生产模式默认即为 timestamp + hash；此处让开发模式（webpack serve）也在时间戳变化时
+      // 再比较内容哈希，避免 git checkout 改写 mtime 导致开发缓存失效
+      module: { timestamp: true, hash: true },
+      resolve: { timestamp: true, hash: true },
+    },
   module: {
     rules: [
       {